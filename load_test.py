@@ -0,0 +1,463 @@
+"""
+Load Test Module
+
+This module provides an asynchronous load-generation harness for the CoinXpert FastAPI service. It drives mixed
+wallet-size workloads against the `/select_utxos/` endpoint at a configurable concurrency, either in-process through
+the httpx ASGI transport or against a running uvicorn server, and reports throughput (RPS), p50/p99 latency and
+event-loop lag so the scaling limits of the service can be measured and regressions caught.
+
+The coin selection runs on the event loop, so its cost grows quickly with the wallet size. As an example, on one
+development machine an in-process request took about 0.1s for 5 UTXOs, 1s for 50 UTXOs and 10s for 500 UTXOs; size
+`--requests` and `--wallet-sizes` accordingly.
+
+In-process, the reported latency is what a client would see once its request is in flight, including the time spent
+waiting behind the other in-flight requests blocking the shared event loop, and the event-loop lag is how long the
+service keeps the loop from running anything else. Against a server, the latency is measured over HTTP and the
+service's event loop cannot be observed.
+
+Usage:
+    python load_test.py --requests 60 --concurrency 4 --wallet-sizes 5 20 50
+    python load_test.py --serve --requests 200 --concurrency 16 --json
+    python load_test.py --url http://127.0.0.1:8000 --requests 200 --timeout 60
+    python load_test.py --requests 60 --max-p99-ms 2000 --min-rps 1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+import httpx
+from httpx import AsyncClient
+from httpx._transports.asgi import ASGITransport
+
+
+DEFAULT_WALLET_SIZES = [5, 20, 50]
+DEFAULT_TIMEOUT = 30.0
+
+
+def generate_wallet_payload(nb_utxos: int, rng: random.Random) -> dict:
+    """
+    Generates a `/select_utxos/` request payload for a wallet of the given size.
+
+    The target is drawn between 10% and 60% of the wallet balance so that every request is satisfiable.
+
+    Parameters:
+    - nb_utxos (int): The number of UTXOs in the generated wallet.
+    - rng (random.Random): The random generator used to draw UTXO values and the target.
+
+    Returns:
+    - dict: A JSON-serializable payload with `utxos` and `target` keys.
+    """
+    if nb_utxos <= 0:
+        raise ValueError("The number of UTXOs must be positive.")
+
+    utxos = [{"value": round(rng.uniform(0.001, 2.0), 8)} for _ in range(nb_utxos)]
+    balance = sum(utxo["value"] for utxo in utxos)
+    target = round(balance * rng.uniform(0.1, 0.6), 8)
+    return {"utxos": utxos, "target": target}
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Computes a percentile of the given values using linear interpolation between closest ranks.
+
+    Parameters:
+    - values (List[float]): The sample values.
+    - percent (float): The percentile to compute, between 0 and 100.
+
+    Returns:
+    - float: The requested percentile, or 0.0 if there are no values.
+    """
+    if not 0 <= percent <= 100:
+        raise ValueError("The percentile must be between 0 and 100.")
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * percent / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def probe_event_loop_lag(lags: List[float]):
+    """
+    Schedules a callback recording how long the event loop takes to get back to it.
+
+    Called right before a request is sent, the recorded delay is how long that request, and any work already queued,
+    kept the loop from running other callbacks.
+
+    Parameters:
+    - lags (List[float]): The list the lag sample (in seconds) is appended to.
+    """
+    loop = asyncio.get_running_loop()
+    scheduled = loop.time()
+    loop.call_soon(lambda: lags.append(loop.time() - scheduled))
+
+
+def describe_failure(response=None, error: Optional[Exception] = None) -> str:
+    """
+    Builds a short, groupable reason for a failed request.
+
+    Parameters:
+    - response (httpx.Response): The response of the request, if one was received.
+    - error (Exception): The exception raised by the request, if any.
+
+    Returns:
+    - str: `HTTP <status code>` for an error response, or the exception class name.
+    """
+    if error is not None:
+        return type(error).__name__
+    return f"HTTP {response.status_code}"
+
+
+async def run_load_test(client: AsyncClient, total_requests: int = 60, concurrency: int = 4,
+                        wallet_sizes: Optional[List[int]] = None, warmup: int = 3, seed: int = 0) -> dict:
+    """
+    Drives a mixed wallet-size workload against `/select_utxos/` and summarizes the results.
+
+    Only successful (HTTP 200) responses count towards RPS and the latency percentiles; failed requests are reported
+    in `errors`, grouped by reason in `error_reasons`.
+
+    Parameters:
+    - client (AsyncClient): The client used to send the requests (ASGI transport or real HTTP).
+    - total_requests (int): The total number of measured requests to send.
+    - concurrency (int): The maximum number of requests in flight at any time.
+    - wallet_sizes (List[int]): The wallet sizes (number of UTXOs) cycled through by the workload.
+    - warmup (int): The number of requests sent sequentially before the measurement and left out of the results.
+    - seed (int): The seed used to generate the payloads, so that runs are reproducible.
+
+    Returns:
+    - dict: The overall summary (RPS, latency percentiles, event-loop lag, errors) and a per wallet size breakdown.
+
+    Raises:
+    - RuntimeError: If every warm-up request fails, e.g. because the service is down.
+    """
+    if total_requests <= 0:
+        raise ValueError("The number of requests must be positive.")
+    if concurrency <= 0:
+        raise ValueError("The concurrency must be positive.")
+    if warmup < 0:
+        raise ValueError("The number of warm-up requests must not be negative.")
+
+    wallet_sizes = wallet_sizes or DEFAULT_WALLET_SIZES
+    rng = random.Random(seed)
+    # Payloads are built up front so that their generation is not measured as service latency
+    payloads = [(size, generate_wallet_payload(size, rng))
+                for size in (wallet_sizes[i % len(wallet_sizes)] for i in range(warmup + total_requests))]
+    warmup_payloads, payloads = payloads[:warmup], payloads[warmup:]
+
+    # Warm-up absorbs first-request overhead (connection setup, schema building) so that it does not skew p99
+    warmup_reasons = {}
+    for _, payload in warmup_payloads:
+        response, error = None, None
+        try:
+            response = await client.post("/select_utxos/", json=payload)
+        except Exception as e:
+            error = e
+        if error is not None or response.status_code != 200:
+            reason = describe_failure(response, error)
+            warmup_reasons[reason] = warmup_reasons.get(reason, 0) + 1
+    if warmup and sum(warmup_reasons.values()) == warmup:
+        raise RuntimeError(f"All {warmup} warm-up requests failed: {warmup_reasons}")
+
+    # A size may be listed several times to weight the mix, but its results are only kept once
+    unique_sizes = list(dict.fromkeys(wallet_sizes))
+    latencies = {size: [] for size in unique_sizes}
+    errors = {size: 0 for size in unique_sizes}
+    error_reasons = {}
+    lags = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(size, payload):
+        async with semaphore:
+            # Started before yielding so that, in-process, the time spent behind other requests blocking the loop is
+            # part of the latency, as it would be for a real client.
+            start = time.perf_counter()
+            # Through the ASGI transport a request never suspends, so without this yield every request would run in
+            # a single loop iteration and each lag sample would add up the blocking time of all the previous ones.
+            await asyncio.sleep(0)
+            probe_event_loop_lag(lags)
+            response, error = None, None
+            try:
+                response = await client.post("/select_utxos/", json=payload)
+            except Exception as e:
+                error = e
+            latency = time.perf_counter() - start
+
+        if error is None and response.status_code == 200:
+            latencies[size].append(latency)
+        else:
+            reason = describe_failure(response, error)
+            errors[size] += 1
+            error_reasons[reason] = error_reasons.get(reason, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(size, payload) for size, payload in payloads))
+    duration = time.perf_counter() - start
+    # Let the probes of the last requests run
+    await asyncio.sleep(0)
+
+    all_latencies = [latency for size_latencies in latencies.values() for latency in size_latencies]
+    return {
+        "requests": total_requests,
+        "successes": len(all_latencies),
+        "concurrency": concurrency,
+        "duration": duration,
+        "rps": len(all_latencies) / duration if duration > 0 else 0.0,
+        "latency_p50": percentile(all_latencies, 50),
+        "latency_p99": percentile(all_latencies, 99),
+        "loop_lag": {
+            "samples": len(lags),
+            "p50": percentile(lags, 50),
+            "p99": percentile(lags, 99),
+            "max": max(lags, default=0.0),
+        },
+        "errors": sum(errors.values()),
+        "error_reasons": error_reasons,
+        "warmup_errors": warmup_reasons,
+        "by_wallet_size": {
+            size: {
+                "requests": len(latencies[size]) + errors[size],
+                "latency_p50": percentile(latencies[size], 50),
+                "latency_p99": percentile(latencies[size], 99),
+                "errors": errors[size],
+            }
+            for size in unique_sizes
+        },
+    }
+
+
+async def run_in_process(app, **kwargs) -> dict:
+    """
+    Runs the load test against an ASGI app in-process through the httpx ASGI transport.
+
+    The app shares the event loop of the load generator, so `loop_lag` measures how long the service blocks the loop.
+    Whatever the app prints is sent to stderr, so that stdout only carries the report.
+
+    Parameters:
+    - app: The ASGI application to load, typically `main.app`.
+    - **kwargs: Forwarded to `run_load_test`.
+
+    Returns:
+    - dict: The load test summary.
+    """
+    with contextlib.redirect_stdout(sys.stderr):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            return await run_load_test(client, **kwargs)
+
+
+async def run_against_server(base_url: str, timeout: float = DEFAULT_TIMEOUT, **kwargs) -> dict:
+    """
+    Runs the load test against a running server, e.g. a local `uvicorn main:app`.
+
+    The server runs its own event loop, which cannot be observed from here: the measured lag is the one of the load
+    generator, reported as `client_loop_lag` and kept out of the service figures.
+
+    Parameters:
+    - base_url (str): The server base URL, e.g. `http://127.0.0.1:8000`.
+    - timeout (float): The per-request timeout in seconds; requests timing out are counted as errors.
+    - **kwargs: Forwarded to `run_load_test`.
+
+    Returns:
+    - dict: The load test summary.
+    """
+    async with AsyncClient(base_url=base_url, timeout=timeout) as client:
+        summary = await run_load_test(client, **kwargs)
+    summary["client_loop_lag"] = summary.pop("loop_lag")
+    return summary
+
+
+@contextlib.contextmanager
+def start_server(startup_timeout: float = 30.0):
+    """
+    Starts `uvicorn main:app` on a free local port in a subprocess, and stops it on exit.
+
+    Parameters:
+    - startup_timeout (float): How long to wait for the server to answer, in seconds.
+
+    Yields:
+    - str: The base URL of the started server.
+
+    Raises:
+    - RuntimeError: If the server does not answer within `startup_timeout`.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+    # The server output is discarded: the endpoint prints every response, which would drown the report
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode} before serving requests")
+            try:
+                httpx.get(base_url + "/", timeout=1.0)
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"uvicorn did not answer on {base_url} within {startup_timeout}s")
+                time.sleep(0.1)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def check_thresholds(summary: dict, max_p99_ms: Optional[float] = None, min_rps: Optional[float] = None,
+                     max_errors: Optional[int] = None) -> List[str]:
+    """
+    Checks a load test summary against regression thresholds.
+
+    A run without any successful request crosses the latency and RPS thresholds, since there is nothing to measure.
+
+    Parameters:
+    - summary (dict): The summary returned by `run_load_test`.
+    - max_p99_ms (float): The maximum allowed p99 latency, in milliseconds.
+    - min_rps (float): The minimum required throughput, in successful requests per second.
+    - max_errors (int): The maximum allowed number of failed requests.
+
+    Returns:
+    - List[str]: A description of each crossed threshold, empty if all of them hold.
+    """
+    violations = []
+    if summary["successes"] == 0:
+        if max_p99_ms is not None or min_rps is not None:
+            violations.append("no successful requests")
+    else:
+        if max_p99_ms is not None and summary["latency_p99"] * 1000 > max_p99_ms:
+            violations.append(f"p99 latency {summary['latency_p99'] * 1000:.1f}ms exceeds {max_p99_ms}ms")
+        if min_rps is not None and summary["rps"] < min_rps:
+            violations.append(f"rps {summary['rps']:.1f} is below {min_rps}")
+    if max_errors is not None and summary["errors"] > max_errors:
+        violations.append(f"{summary['errors']} errors exceed {max_errors}")
+    return violations
+
+
+def format_report(summary: dict) -> str:
+    """
+    Formats a load test summary as a human-readable report.
+
+    Parameters:
+    - summary (dict): The summary returned by `run_load_test`.
+
+    Returns:
+    - str: The report, latencies and lags being expressed in milliseconds.
+    """
+    lines = [
+        f"requests={summary['requests']} successes={summary['successes']} concurrency={summary['concurrency']} "
+        f"duration={summary['duration']:.2f}s errors={summary['errors']}",
+    ]
+    if summary["successes"]:
+        lines.append(f"rps={summary['rps']:.1f} "
+                     f"latency p50={summary['latency_p50'] * 1000:.1f}ms p99={summary['latency_p99'] * 1000:.1f}ms")
+    else:
+        lines.append("rps=0.0 latency n/a (no successful requests)")
+    if "loop_lag" in summary:
+        lag = summary["loop_lag"]
+        lines.append(f"event loop lag p50={lag['p50'] * 1000:.1f}ms p99={lag['p99'] * 1000:.1f}ms "
+                     f"max={lag['max'] * 1000:.1f}ms samples={lag['samples']}")
+    for size, stats in summary["by_wallet_size"].items():
+        lines.append(
+            f"  wallet_size={size:<6} requests={stats['requests']:<6} "
+            f"p50={stats['latency_p50'] * 1000:.1f}ms p99={stats['latency_p99'] * 1000:.1f}ms "
+            f"errors={stats['errors']}"
+        )
+    for reason, count in summary["error_reasons"].items():
+        lines.append(f"  error {reason}: {count}")
+    for reason, count in summary["warmup_errors"].items():
+        lines.append(f"  warm-up error {reason}: {count}")
+    if "client_loop_lag" in summary:
+        lag = summary["client_loop_lag"]
+        lines.append(f"load generator (client-side, not the service) event loop lag "
+                     f"p99={lag['p99'] * 1000:.1f}ms max={lag['max'] * 1000:.1f}ms")
+    return "\n".join(lines)
+
+
+def main():
+    """
+    Command-line entry point: runs the load test in-process, against `--url`, or against a uvicorn server started with
+    `--serve`, and prints the report.
+
+    Exits with status 1 when the run cannot be carried out (every warm-up request failed, the server did not start)
+    or when one of the `--max-p99-ms`, `--min-rps` or `--max-errors` thresholds is crossed.
+    """
+    parser = argparse.ArgumentParser(description="Load test the CoinXpert /select_utxos/ endpoint.")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="Base URL of a running server. Runs in-process against main.app if omitted.")
+    target.add_argument("--serve", action="store_true", help="Start `uvicorn main:app` locally and load it.")
+    parser.add_argument("--requests", type=int, default=60, help="Total number of measured requests to send.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum number of requests in flight.")
+    parser.add_argument("--wallet-sizes", type=int, nargs="+", default=DEFAULT_WALLET_SIZES,
+                        help="Wallet sizes (number of UTXOs) cycled through by the workload.")
+    parser.add_argument("--warmup", type=int, default=3, help="Number of unmeasured warm-up requests.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed used to generate the payloads.")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="Per-request timeout in seconds against a server; timed out requests count as errors.")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON instead of a text report.")
+    parser.add_argument("--max-p99-ms", type=float, help="Fail if the p99 latency exceeds this many milliseconds.")
+    parser.add_argument("--min-rps", type=float, help="Fail if fewer successful requests per second are served.")
+    parser.add_argument("--max-errors", type=int, help="Fail if more requests than this fail.")
+    args = parser.parse_args()
+
+    if args.requests <= 0:
+        parser.error("--requests must be positive")
+    if args.concurrency <= 0:
+        parser.error("--concurrency must be positive")
+    if any(size <= 0 for size in args.wallet_sizes):
+        parser.error("--wallet-sizes must all be positive")
+    if args.warmup < 0:
+        parser.error("--warmup must not be negative")
+    if args.timeout <= 0:
+        parser.error("--timeout must be positive")
+
+    kwargs = {
+        "total_requests": args.requests,
+        "concurrency": args.concurrency,
+        "wallet_sizes": args.wallet_sizes,
+        "warmup": args.warmup,
+        "seed": args.seed,
+    }
+    try:
+        if args.url:
+            summary = asyncio.run(run_against_server(args.url, timeout=args.timeout, **kwargs))
+        elif args.serve:
+            with start_server() as base_url:
+                summary = asyncio.run(run_against_server(base_url, timeout=args.timeout, **kwargs))
+        else:
+            from main import app
+            summary = asyncio.run(run_in_process(app, **kwargs))
+    except RuntimeError as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    violations = check_thresholds(summary, args.max_p99_ms, args.min_rps, args.max_errors)
+    if args.json:
+        print(json.dumps(dict(summary, threshold_violations=violations), indent=2))
+    else:
+        print(format_report(summary))
+        for violation in violations:
+            print(f"FAIL: {violation}")
+    if violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import json
+import random
+import sys
+import httpx
+import pytest
+from httpx import AsyncClient
+from load_test import (
+    generate_wallet_payload,
+    percentile,
+    run_load_test,
+    run_in_process,
+    check_thresholds,
+    format_report,
+    main
+)
+from main import app
+
+def test_generate_wallet_payload():
+    payload = generate_wallet_payload(20, random.Random(0))
+    assert len(payload["utxos"]) == 20
+    assert 0 < payload["target"] < sum(utxo["value"] for utxo in payload["utxos"])
+
+    # Same seed gives the same payload
+    assert payload == generate_wallet_payload(20, random.Random(0))
+
+    with pytest.raises(ValueError):
+        generate_wallet_payload(0, random.Random(0))
+
+def test_percentile():
+    values = [4.0, 1.0, 3.0, 2.0, 5.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 100) == 5.0
+    assert percentile([1.0, 2.0], 50) == 1.5
+    assert percentile([], 99) == 0.0
+
+    with pytest.raises(ValueError):
+        percentile(values, 101)
+
+@pytest.mark.asyncio
+async def test_run_in_process():
+    summary = await run_in_process(app, total_requests=6, concurrency=3, wallet_sizes=[3, 10], warmup=1)
+    assert summary["requests"] == 6
+    assert summary["successes"] == 6
+    assert summary["errors"] == 0
+    assert summary["rps"] > 0
+    assert summary["latency_p50"] <= summary["latency_p99"]
+    assert summary["by_wallet_size"][3]["requests"] == 3
+    assert summary["by_wallet_size"][10]["requests"] == 3
+    assert "rps=" in format_report(summary)
+
+@pytest.mark.asyncio
+async def test_run_in_process_event_loop_lag():
+    summary = await run_in_process(app, total_requests=6, concurrency=1, wallet_sizes=[3, 10], warmup=0)
+    lag = summary["loop_lag"]
+    # One sample per request, each bounded by the request blocking the loop rather than by the whole run
+    assert lag["samples"] == 6
+    assert 0 < lag["p50"] <= lag["p99"] <= lag["max"]
+    assert lag["max"] < summary["duration"]
+    assert "event loop lag" in format_report(summary)
+
+@pytest.mark.asyncio
+async def test_run_load_test_errors_excluded_from_latency():
+    def handler(request):
+        if len(request.read()) < 100:
+            return httpx.Response(200, json={})
+        return httpx.Response(400, json={"detail": "Insufficient funds"})
+
+    async with AsyncClient(transport=httpx.MockTransport(handler), base_url="http://test") as client:
+        summary = await run_load_test(client, total_requests=4, concurrency=2, wallet_sizes=[1, 20], warmup=0)
+    assert summary["successes"] == 2
+    assert summary["errors"] == 2
+    assert summary["error_reasons"] == {"HTTP 400": 2}
+    assert summary["by_wallet_size"][20] == {"requests": 2, "latency_p50": 0.0, "latency_p99": 0.0, "errors": 2}
+    assert summary["rps"] == 2 / summary["duration"]
+    assert "error HTTP 400: 2" in format_report(summary)
+
+@pytest.mark.asyncio
+async def test_run_load_test_connection_errors():
+    def handler(request):
+        raise httpx.ConnectError("Connection refused", request=request)
+
+    async with AsyncClient(transport=httpx.MockTransport(handler), base_url="http://test") as client:
+        summary = await run_load_test(client, total_requests=3, concurrency=3, wallet_sizes=[1], warmup=0)
+    assert summary["successes"] == 0
+    assert summary["rps"] == 0
+    assert summary["error_reasons"] == {"ConnectError": 3}
+    assert "no successful requests" in format_report(summary)
+    assert check_thresholds(summary, max_errors=0) == ["3 errors exceed 0"]
+    assert check_thresholds(summary, max_p99_ms=1000) == ["no successful requests"]
+    assert check_thresholds(summary, min_rps=1) == ["no successful requests"]
+
+@pytest.mark.asyncio
+async def test_run_load_test_warmup_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(500)
+        return httpx.Response(200, json={})
+
+    async with AsyncClient(transport=httpx.MockTransport(handler), base_url="http://test") as client:
+        summary = await run_load_test(client, total_requests=2, wallet_sizes=[1], warmup=2)
+    assert summary["warmup_errors"] == {"HTTP 500": 1}
+    assert summary["errors"] == 0
+    assert "warm-up error HTTP 500: 1" in format_report(summary)
+
+@pytest.mark.asyncio
+async def test_run_load_test_aborts_when_warmup_fails():
+    def handler(request):
+        raise httpx.ConnectError("Connection refused", request=request)
+
+    async with AsyncClient(transport=httpx.MockTransport(handler), base_url="http://test") as client:
+        with pytest.raises(RuntimeError):
+            await run_load_test(client, total_requests=2, wallet_sizes=[1], warmup=2)
+
+@pytest.mark.asyncio
+async def test_run_load_test_repeated_wallet_sizes():
+    def handler(request):
+        return httpx.Response(200, json={})
+
+    async with AsyncClient(transport=httpx.MockTransport(handler), base_url="http://test") as client:
+        summary = await run_load_test(client, total_requests=6, wallet_sizes=[1, 1, 2], warmup=0)
+    assert summary["successes"] == 6
+    assert summary["by_wallet_size"][1]["requests"] == 4
+    assert summary["by_wallet_size"][2]["requests"] == 2
+    assert summary["rps"] == 6 / summary["duration"]
+
+@pytest.mark.asyncio
+async def test_run_in_process_latency_includes_queueing():
+    sequential = await run_in_process(app, total_requests=4, concurrency=1, wallet_sizes=[10], warmup=0)
+    concurrent = await run_in_process(app, total_requests=4, concurrency=4, wallet_sizes=[10], warmup=0)
+    # Requests share the event loop, so the last of 4 concurrent requests waits for the 3 others
+    assert concurrent["latency_p99"] > 1.5 * sequential["latency_p99"]
+
+def test_check_thresholds():
+    summary = {"successes": 5, "latency_p99": 0.5, "rps": 10.0, "errors": 0}
+    assert check_thresholds(summary) == []
+    assert check_thresholds(summary, max_p99_ms=1000, min_rps=5, max_errors=0) == []
+    assert len(check_thresholds(summary, max_p99_ms=100, min_rps=20)) == 2
+
+@pytest.mark.asyncio
+async def test_run_load_test_invalid_arguments():
+    with pytest.raises(ValueError):
+        await run_in_process(app, total_requests=0)
+    with pytest.raises(ValueError):
+        await run_in_process(app, concurrency=0)
+    with pytest.raises(ValueError):
+        await run_in_process(app, warmup=-1)
+
+def test_main_json(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["load_test.py", "--requests", "2", "--warmup", "0", "--wallet-sizes", "3",
+                                      "--json"])
+    main()
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["successes"] == 2
+    assert summary["threshold_violations"] == []
+
+def test_main_threshold_crossed(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["load_test.py", "--requests", "2", "--warmup", "0", "--wallet-sizes", "3",
+                                      "--min-rps", "1000000"])
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 1
+    assert "FAIL: rps" in capsys.readouterr().out
+
+@pytest.mark.parametrize("args", [
+    ["--requests", "0"],
+    ["--concurrency", "0"],
+    ["--wallet-sizes", "0"],
+    ["--warmup", "-1"],
+    ["--timeout", "0"],
+    ["--url", "http://127.0.0.1:8000", "--serve"],
+])
+def test_main_invalid_arguments(monkeypatch, capsys, args):
+    monkeypatch.setattr(sys, "argv", ["load_test.py"] + args)
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 2
+    assert "error:" in capsys.readouterr().err